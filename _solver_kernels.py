@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+_solver_kernels.py
+------------------
+Núcleo del filtrado de candidatos de un evento flexible.
+
+filter_candidates aplica, sobre un arreglo de inicios ya acotado a la ventana:
+- días activos (ningún slot del evento en un día deshabilitado)
+- conflictos con fijos que bloquean (si el evento no puede solaparse)
+- preferencia con fallback de 3 niveles: preferidos → horario laboral → todos
+
+Todas las consultas son sumas prefijas (ver solver_common.prefix_sum). Junto
+con los inicios devuelve cuántos slots fuera de preferencia tiene cada uno:
+es la misma resta que decide el nivel 1 y la reutiliza el cálculo de costos.
+
+Con SOLVER_JIT=1 y Numba instalado se usa un kernel compilado (@njit); si no,
+la versión NumPy equivalente. Numba se importa la primera vez que se usa: su
+import cuesta más que todo el filtrado en agendas normales, y el solver corre
+como proceso de una sola llamada.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Tuple
+
+import numpy as np
+
+
+USE_JIT = os.environ.get("SOLVER_JIT", "0") == "1"
+
+_jit_kernel: Any = None  # None = sin intentar; False = Numba no disponible
+
+
+def _filter_numpy(
+    starts: np.ndarray,
+    dur: int,
+    check_blocked: bool,
+    blocked_cumsum: np.ndarray,
+    disallowed_cumsum: np.ndarray,
+    notpref_cumsum: np.ndarray,
+    notwork_cumsum: np.ndarray,
+    use_pref: bool,
+    use_work: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    ends = starts + dur
+    ok = disallowed_cumsum[ends] == disallowed_cumsum[starts]
+    if check_blocked:
+        ok &= blocked_cumsum[ends] == blocked_cumsum[starts]
+    starts = starts[ok]
+    ends = ends[ok]
+    offpref = (notpref_cumsum[ends] - notpref_cumsum[starts]).astype(np.int64)
+
+    if use_pref:
+        pref = offpref == 0
+        if pref.any():
+            return starts[pref], offpref[pref]
+    if use_work:
+        work = notwork_cumsum[ends] == notwork_cumsum[starts]
+        if work.any():
+            return starts[work], offpref[work]
+    return starts, offpref
+
+
+def _filter_loop(
+    starts: np.ndarray,
+    dur: int,
+    check_blocked: bool,
+    blocked_cumsum: np.ndarray,
+    disallowed_cumsum: np.ndarray,
+    notpref_cumsum: np.ndarray,
+    notwork_cumsum: np.ndarray,
+    use_pref: bool,
+    use_work: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Misma lógica que _filter_numpy en un solo recorrido (pensado para @njit).
+    n = starts.shape[0]
+    ok = np.zeros(n, dtype=np.bool_)
+    pref = np.zeros(n, dtype=np.bool_)
+    work = np.zeros(n, dtype=np.bool_)
+    offpref = np.zeros(n, dtype=np.int64)
+    n_pref = 0
+    n_work = 0
+    for i in range(n):
+        s = starts[i]
+        e = s + dur
+        if disallowed_cumsum[e] != disallowed_cumsum[s]:
+            continue
+        if check_blocked and blocked_cumsum[e] != blocked_cumsum[s]:
+            continue
+        ok[i] = True
+        offpref[i] = notpref_cumsum[e] - notpref_cumsum[s]
+        if use_pref and offpref[i] == 0:
+            pref[i] = True
+            n_pref += 1
+        if use_work and notwork_cumsum[e] == notwork_cumsum[s]:
+            work[i] = True
+            n_work += 1
+    if n_pref > 0:
+        return starts[pref], offpref[pref]
+    if n_work > 0:
+        return starts[work], offpref[work]
+    return starts[ok], offpref[ok]
+
+
+def _load_jit_kernel() -> Any:
+    try:
+        from numba import njit
+    except ImportError:
+        return False
+    return njit(cache=True, boundscheck=False)(_filter_loop)
+
+
+def filter_candidates(
+    starts: np.ndarray,
+    dur: int,
+    check_blocked: bool,
+    blocked_cumsum: np.ndarray,
+    disallowed_cumsum: np.ndarray,
+    notpref_cumsum: np.ndarray,
+    notwork_cumsum: np.ndarray,
+    use_pref: bool,
+    use_work: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Devuelve los inicios (int64, en el mismo orden) que pasan los filtros y,
+    en paralelo, sus slots fuera de preferencia.
+    `starts + dur` debe caber en las sumas prefijas (inicio <= total - dur).
+    """
+    global _jit_kernel
+    args = (
+        np.asarray(starts, dtype=np.int64), int(dur), bool(check_blocked),
+        blocked_cumsum, disallowed_cumsum, notpref_cumsum, notwork_cumsum,
+        bool(use_pref), bool(use_work),
+    )
+    if USE_JIT:
+        if _jit_kernel is None:
+            _jit_kernel = _load_jit_kernel()
+        if _jit_kernel:
+            return _jit_kernel(*args)
+    return _filter_numpy(*args)
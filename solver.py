@@ -33,7 +33,9 @@ Contrato de ENTRADA (resumen):
   "policy": {
     "allowWeekend": false,
     "noOverlapCapacity": 1,
-    "remoteCapacity": 9999
+    "remoteCapacity": 9999,
+    "maxLookaheadSlots": 2016   # opcional (heurística): ventanas no RANGO solo hasta now + N slots;
+                                # puede perder el óptimo si todo lo cercano está ocupado
   }
 }
 
@@ -48,13 +50,21 @@ Contrato de SALIDA:
 """
 
 from __future__ import annotations
-import sys, json, math, argparse
-from typing import Any, Dict, List, Tuple, Set
+import os, sys, json, math, argparse
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+import numpy as np
+
 from ortools.sat.python import cp_model
 
+try:
+    import orjson  # opcional: parseo/serialización más rápidos en el CLI
+except ImportError:
+    orjson = None
+
 from solver_common import (
     Horizon,
     parse_iso_localized,
@@ -62,19 +72,108 @@ from solver_common import (
     safe_positive_int,
     FixedEvent,
     FlexibleEvent,
-    Costs,
+    canonical_windows,
     expand_window_slots,
-    remove_conflicting_starts,
+    blocked_prefix_sum,
+    slot_calendar,
+    inactive_day_mask,
+    working_hours_mask,
+    ranges_mask,
     reduce_candidates,
-    count_offpref_slots,
-    crosses_day,
+    prefix_sum,
+    candidate_costs,
+    weight_table,
+    greedy_assignment,
 )
+from _solver_kernels import filter_candidates
+
+
+# Parámetros afinados de CP-SAT (SOLVER_TUNING=0 vuelve a los de por defecto).
+# SOLVER_RANDOM_SEED fija la semilla para comparar corridas.
+SOLVER_TUNING = os.environ.get("SOLVER_TUNING", "1") != "0"
+SOLVER_RANDOM_SEED = safe_positive_int(os.environ.get("SOLVER_RANDOM_SEED"), 0)
+
+# Tablas por horizonte reutilizables entre llamadas (ver slot_tables)
+_SLOT_TABLES_CACHE: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = OrderedDict()
+_SLOT_TABLES_CACHE_SIZE = 32
 
 
 # -----------------------------
 # Solver principal
 # -----------------------------
 
+def _build_slot_tables(
+    horizon: Horizon,
+    allowed_days: Set[int],
+    day_start_tuple: Tuple[int, int],
+    day_end_tuple: Tuple[int, int],
+    preferred_ranges: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    # Ventanas SEMANA/MES/PRONTO: dependen solo del horizonte
+    semana_range, mes_range, pronto_len = canonical_windows(horizon)
+
+    # working_mask: siempre calculado desde dayStart/dayEnd/activeDays.
+    # Sirve como nivel intermedio de fallback cuando los slots preferidos están bloqueados.
+    working_mask = working_hours_mask(horizon, allowed_days, day_start_tuple, day_end_tuple)
+
+    # preferred_mask: si viene expandido, lo usamos; si no, fallback al horario laboral.
+    if preferred_ranges:
+        preferred_mask = ranges_mask(horizon, preferred_ranges)
+    else:
+        preferred_mask = working_mask.copy()
+
+    # Sumas prefijas de los slots NO preferidos / fuera de horario laboral:
+    # slots fuera de preferencia en [s, s+dur) = cs[s+dur] - cs[s].
+    notpref_cumsum = prefix_sum(1 - preferred_mask)
+    notwork_cumsum = prefix_sum(1 - working_mask)
+
+    # Calendario por slot (día de la semana / día) y slots en días no activos
+    slot_weekday, slot_day = slot_calendar(horizon)
+    disallowed_cumsum = prefix_sum(inactive_day_mask(slot_weekday, allowed_days))
+
+    tables = {
+        "windows": (semana_range, mes_range, pronto_len),
+        "preferred_mask": preferred_mask,
+        "working_mask": working_mask,
+        "notpref_cumsum": notpref_cumsum,
+        "notwork_cumsum": notwork_cumsum,
+        "slot_day": slot_day,
+        "disallowed_cumsum": disallowed_cumsum,
+    }
+    for value in tables.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False  # compartidas entre llamadas
+    return tables
+
+
+def slot_tables(
+    horizon: Horizon,
+    allowed_days: Set[int],
+    day_start_tuple: Tuple[int, int],
+    day_end_tuple: Tuple[int, int],
+    preferred_ranges: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Máscaras, sumas prefijas y ventanas que dependen solo del horizonte y de la
+    política/disponibilidad del usuario. Se cachean (LRU) a nivel de módulo
+    para llamadas consecutivas con el mismo horizonte dentro de un proceso.
+    """
+    key = (
+        horizon.tz.key, horizon.start_dt.isoformat(), horizon.end_dt.isoformat(), horizon.slot_minutes,
+        tuple(sorted(allowed_days)), day_start_tuple, day_end_tuple,
+        tuple((pr["start"], pr["end"]) for pr in preferred_ranges),
+    )
+    tables = _SLOT_TABLES_CACHE.get(key)
+    if tables is not None:
+        _SLOT_TABLES_CACHE.move_to_end(key)
+        return tables
+    tables = _build_slot_tables(horizon, allowed_days, day_start_tuple, day_end_tuple, preferred_ranges)
+    _SLOT_TABLES_CACHE[key] = tables
+    if len(_SLOT_TABLES_CACHE) > _SLOT_TABLES_CACHE_SIZE:
+        _SLOT_TABLES_CACHE.popitem(last=False)
+    return tables
+
+
 def solve_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
     tz = ZoneInfo(payload["user"]["timezone"])
     h = payload["horizon"]
@@ -82,9 +181,13 @@ def solve_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     start_dt = parse_iso_localized(h["start"], tz)
     end_dt = parse_iso_localized(h["end"], tz)
-    horizon = Horizon(tz=tz, start_dt=start_dt, end_dt=end_dt, slot_minutes=slot_minutes)
-
     policy = payload.get("policy", {})
+    # Heurística opcional: acota las ventanas amplias a now_slot + maxLookaheadSlots
+    max_lookahead = safe_positive_int(policy.get("maxLookaheadSlots"), 0) or None
+    horizon = Horizon(
+        tz=tz, start_dt=start_dt, end_dt=end_dt, slot_minutes=slot_minutes, max_lookahead=max_lookahead
+    )
+
     allowed_days = set()
     for d in policy.get("activeDays", []):
         try:
@@ -101,71 +204,45 @@ def solve_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
     buffer_minutes = safe_positive_int(policy.get("eventBufferMinutes"), 0)
     buffer_slots = math.ceil(buffer_minutes / slot_minutes) if buffer_minutes else 0
     lead_minutes = safe_positive_int(policy.get("schedulingLeadMinutes"), 0)
+    # Capacidad de eventos que pueden solaparse (remotos); 9999 = sin límite.
+    # Valores < 1 no dejarían colocar ningún remoto: se tratan también como sin límite.
+    remote_capacity = safe_positive_int(policy.get("remoteCapacity"), 9999)
+    limit_remote = 1 <= remote_capacity < 9999
 
     # now_slot: para PRONTO y distancia
     now_local = datetime.now(tz)
     now_slot = max(0, horizon.dt_to_next_slot(now_local + timedelta(minutes=lead_minutes)))
 
-    # preferred slots: si viene expandido, lo usamos; si no, fallback básico 9-18 (L-V), 10-14 (Sáb)
+    # Máscaras, sumas prefijas y ventanas del horizonte (cacheadas entre llamadas)
     preferred_ranges = payload.get("availability", {}).get("preferred", [])
-    preferred_slots: Set[int] = set()
-    if preferred_ranges:
-        for r in preferred_ranges:
-            a = parse_iso_localized(r["start"], tz)
-            b = parse_iso_localized(r["end"], tz)
-            preferred_slots.update(horizon.slots_in_interval(a, b))
-    else:
-        cur = horizon.start_dt
-        while cur < horizon.end_dt:
-            dow = cur.weekday()
-            if dow in allowed_days:
-                a = cur.replace(
-                    hour=day_start_tuple[0],
-                    minute=day_start_tuple[1],
-                    second=0,
-                    microsecond=0
-                )
-                b = cur.replace(
-                    hour=day_end_tuple[0],
-                    minute=day_end_tuple[1],
-                    second=0,
-                    microsecond=0
-                )
-                if b <= a:
-                    a = cur.replace(hour=0, minute=0, second=0, microsecond=0)
-                    b = (a + timedelta(days=1))
-                preferred_slots.update(horizon.slots_in_interval(a, b))
-            cur = (cur + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-
-    # working_hours_slots: siempre calculado desde dayStart/dayEnd/activeDays.
-    # Sirve como nivel intermedio de fallback cuando los slots preferidos están bloqueados.
-    working_hours_slots: Set[int] = set()
-    cur = horizon.start_dt
-    while cur < horizon.end_dt:
-        dow = cur.weekday()
-        if dow in allowed_days:
-            a = cur.replace(hour=day_start_tuple[0], minute=day_start_tuple[1], second=0, microsecond=0)
-            b = cur.replace(hour=day_end_tuple[0], minute=day_end_tuple[1], second=0, microsecond=0)
-            if b <= a:
-                a = cur.replace(hour=0, minute=0, second=0, microsecond=0)
-                b = (a + timedelta(days=1))
-            working_hours_slots.update(horizon.slots_in_interval(a, b))
-        cur = (cur + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    tables = slot_tables(horizon, allowed_days, day_start_tuple, day_end_tuple, preferred_ranges)
+    semana_range, mes_range, pronto_len = tables["windows"]
+    preferred_mask = tables["preferred_mask"]
+    working_mask = tables["working_mask"]
+    notpref_cumsum = tables["notpref_cumsum"]
+    notwork_cumsum = tables["notwork_cumsum"]
+    slot_day = tables["slot_day"]
+    disallowed_cumsum = tables["disallowed_cumsum"]
+
+    # Marcas de tiempo de todos los eventos: cada ISO distinto se parsea una
+    # vez y se convierte a slots (piso, techo) en un solo paso.
+    events_json = payload["events"]
+    fixed_json = events_json.get("fixed", []) + events_json.get("newFixed", [])
+    movable_json = events_json.get("movable", [])
+    new_json = events_json.get("new", [])
+    iso_slots = horizon.isos_to_slots(
+        [f[k] for f in fixed_json for k in ("start", "end")]
+        + [m[k] for m in movable_json for k in ("currentStart", "windowStart", "windowEnd") if m.get(k)]
+        + [n[k] for n in new_json for k in ("windowStart", "windowEnd") if n.get(k)]
+    )
 
     # Fixed events
-    fixed_json = payload["events"].get("fixed", []) + payload["events"].get("newFixed", [])
     fixed: List[FixedEvent] = []
     hard_conflicts: List[str] = []
 
     for f in fixed_json:
-        start = parse_iso_localized(f["start"], tz)
-        end = parse_iso_localized(f["end"], tz)
-        s = horizon.dt_to_slot(start)
-        e = horizon.dt_to_slot(end)
-        if horizon.slot_to_dt(e) < end:
-            e += 1
-        s = max(s, 0)
-        e = min(e, horizon.total_slots)
+        s = max(iso_slots[f["start"]][0], 0)
+        e = min(iso_slots[f["end"]][1], horizon.total_slots)
         if e <= s:
             continue
         fixed.append(FixedEvent(
@@ -177,13 +254,22 @@ def solve_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
             )
         ))
 
-    # Chequeo rápido de conflictos UI vs UI (fixed que bloquean capacidad)
-    blocking = [f for f in fixed if f.blocks_capacity]
-    for i in range(len(blocking)):
-        for j in range(i + 1, len(blocking)):
-            a, b = blocking[i], blocking[j]
-            if not (a.end_slot <= b.start_slot or b.end_slot <= a.start_slot):
-                hard_conflicts.append(f"UI/UI conflict: {a.id} vs {b.id}")
+    # Chequeo rápido de conflictos UI vs UI (fixed que bloquean capacidad):
+    # barrido por inicio; `active` son los fijos que siguen abiertos en b.start.
+    # Los pares se reportan por índice de entrada para que el mensaje no
+    # dependa del orden de inicio.
+    blocking_idx = sorted(
+        ((i, f) for i, f in enumerate(fixed) if f.blocks_capacity), key=lambda t: t[1].start_slot
+    )
+    blocking = [f for _, f in blocking_idx]
+    active: List[Tuple[int, FixedEvent]] = []
+    conflict_pairs: List[Tuple[int, int]] = []
+    for j, b in blocking_idx:
+        active = [(i, a) for i, a in active if a.end_slot > b.start_slot]
+        conflict_pairs.extend((min(i, j), max(i, j)) for i, _ in active)
+        active.append((j, b))
+    for i, j in sorted(conflict_pairs):
+        hard_conflicts.append(f"UI/UI conflict: {fixed[i].id} vs {fixed[j].id}")
 
     if hard_conflicts:
         return {
@@ -194,41 +280,55 @@ def solve_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
             "diagnostics": {"hardConflicts": hard_conflicts, "summary": "Infeasible: UI/UI conflict"}
         }
 
+    # Uso de remoteCapacity por slot de los fijos que no bloquean (remotos /
+    # solapables). Si ellos solos ya la exceden, se reporta como conflicto duro
+    # y el perfil se recorta a la capacidad: el exceso no se puede arreglar
+    # moviendo flexibles y no debe volver infactible al resto del modelo.
+    fixed_remote = [f for f in fixed if not f.blocks_capacity]
+    remote_conflicts: List[str] = []
+    fixed_remote_usage = np.zeros(horizon.total_slots, dtype=np.int32)
+    if limit_remote and fixed_remote:
+        delta = np.zeros(horizon.total_slots + 1, dtype=np.int32)
+        for f in fixed_remote:
+            delta[f.start_slot] += 1
+            delta[f.end_slot] -= 1
+        fixed_remote_usage = np.cumsum(delta[:-1], dtype=np.int32)
+        over = fixed_remote_usage > remote_capacity
+        if over.any():
+            # tramos contiguos excedidos y los fijos que los tocan (en orden de entrada)
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], over.astype(np.int8), [0]))))
+            for a, b in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                ids = [f.id for f in fixed_remote if f.start_slot < b and f.end_slot > a]
+                remote_conflicts.append(
+                    f"Remote capacity exceeded: {', '.join(ids)} (remoteCapacity={remote_capacity})"
+                )
+            fixed_remote_usage = np.minimum(fixed_remote_usage, remote_capacity)
+
     # Flexible events (movable + new)
     weights = payload["weights"]
-    move_w = weights["move"]
-    dist_w = weights["distancePerSlot"]
-    offpref_w = weights["offPreferencePerSlot"]
-    crossday_w = weights["crossDayPerEvent"]
-
     flex: List[FlexibleEvent] = []
 
     def duration_to_slots(mins: int) -> int:
         return max(1, math.ceil(mins / slot_minutes))
 
+    def slot_of(ev_json: Dict[str, Any], key: str) -> Optional[int]:
+        return iso_slots[ev_json[key]][0] if ev_json.get(key) else None
+
     # Movable
-    for m in payload["events"].get("movable", []):
-        cur_start_slot = None
-        if m.get("currentStart"):
-            cur_dt = parse_iso_localized(m["currentStart"], tz)
-            cur_start_slot = horizon.dt_to_slot(cur_dt)
-        wstart = parse_iso_localized(m["windowStart"], tz).astimezone(tz) if m.get("windowStart") else None
-        wend = parse_iso_localized(m["windowEnd"], tz).astimezone(tz) if m.get("windowEnd") else None
+    for m in movable_json:
         flex.append(FlexibleEvent(
             id=m["id"],
             priority=m["priority"],
             duration_slots=duration_to_slots(int(m["durationMin"])),
             overlap=(not m.get("isInPerson", True)) or m.get("canOverlap", False),
-            current_start_slot=cur_start_slot,
+            current_start_slot=slot_of(m, "currentStart"),
             window=m["window"],
-            window_start=horizon.dt_to_slot(wstart) if wstart else None,
-            window_end=horizon.dt_to_slot(wend) if wend else None
+            window_start=slot_of(m, "windowStart"),
+            window_end=slot_of(m, "windowEnd")
         ))
 
     # New
-    for n in payload["events"].get("new", []):
-        wstart = parse_iso_localized(n["windowStart"], tz).astimezone(tz) if n.get("windowStart") else None
-        wend = parse_iso_localized(n["windowEnd"], tz).astimezone(tz) if n.get("windowEnd") else None
+    for n in new_json:
         flex.append(FlexibleEvent(
             id=n["id"],
             priority=n["priority"],
@@ -236,146 +336,201 @@ def solve_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
             overlap=(not n.get("isInPerson", True)) or n.get("canOverlap", False),
             current_start_slot=None,
             window=n["window"],
-            window_start=horizon.dt_to_slot(wstart) if wstart else None,
-            window_end=horizon.dt_to_slot(wend) if wend else None
+            window_start=slot_of(n, "windowStart"),
+            window_end=slot_of(n, "windowEnd")
         ))
 
+    # Filas por código de prioridad: (distancia, fuera de preferencia, cruce de día, mover)
+    weights_by_code = weight_table(weights, (e.priority_code for e in flex))
+
     # Generación de candidatos + costos por candidato
     candidates: Dict[str, List[int]] = {}
-    costs: Dict[Tuple[str, int], Costs] = {}
-
-    # starts fijos que bloquean para filtrado
-    fixed_blocking = [f for f in fixed if f.blocks_capacity]
-
-    # Helper: filtrar candidatos usando 3 niveles de fallback:
-    #   Nivel 1 — slots dentro de preferencia del usuario (horario ideal)
-    #   Nivel 2 — slots dentro de horario laboral (dayStart-dayEnd)
-    #   Nivel 3 — cualquier slot disponible (sin restricción de horario)
-    # Esto garantiza que eventos SIEMPRE tengan candidatos mientras haya slots libres.
-    def filter_to_preferred_if_possible(starts: List[int], dur: int, require: bool = False) -> List[int]:
-        def fits_set(s: int, slot_set: Set[int]) -> bool:
-            return all(t in slot_set for t in range(s, s + dur))
-
-        # Nivel 1: slots preferidos del usuario
-        if preferred_slots:
-            pref = [s for s in starts if fits_set(s, preferred_slots)]
-            if pref:
-                return pref
-
-        # Nivel 2: horario laboral (fallback intermedio)
-        if working_hours_slots:
-            work = [s for s in starts if fits_set(s, working_hours_slots)]
-            if work:
-                return work
-
-        # Nivel 3: cualquier slot (no filtrar)
-        return starts
-
-    # Helper: filtrar días deshabilitados — verifica TODOS los días que ocupa el evento
-    def filter_allowed_days(starts: List[int], dur: int) -> List[int]:
-        if len(allowed_days) >= 7:
-            return starts
-        out = []
-        for s in starts:
-            day_set = {horizon.slot_to_dt(t).weekday() for t in range(s, s + dur)}
-            if day_set.issubset(allowed_days):
-                out.append(s)
-        return out
+    cand_costs: Dict[str, List[int]] = {}  # paralelo a candidates[e.id]
 
-    for e in flex:
-        base_range = list(expand_window_slots(e, horizon, now_slot))
+    # fijos que bloquean, ya ordenados por inicio (también es el orden en que
+    # entran al NoOverlap)
+    fixed_blocking = blocking
+    # Slots bloqueados (con buffer) para filtrar inicios en O(1) por candidato;
+    # solo se consulta para eventos que no pueden solaparse (buffer completo).
+    blocked_cumsum = blocked_prefix_sum(fixed_blocking, horizon.total_slots, buffer_slots)
+
+    has_pref = bool(preferred_mask.any())
+    has_work = bool(working_mask.any())
+
+    def feasible_starts(e: FlexibleEvent) -> Tuple[np.ndarray, np.ndarray]:
+        window = expand_window_slots(e, horizon, now_slot, semana_range, mes_range, pronto_len)
         buffer_for_event = buffer_slots if not e.overlap else 0
 
         # asegura que quepa completo: último inicio posible = end - dur
         latest_start = horizon.total_slots - (e.duration_slots + buffer_for_event)
         if latest_start < 0:
-            candidates[e.id] = []
-            continue
-        base_range = [s for s in base_range if 0 <= s <= latest_start]
-
-        # política de días activos
-        base_range = filter_allowed_days(base_range, e.duration_slots)
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        base_range = np.arange(max(window.start, 0), min(window.stop, latest_start + 1), dtype=np.int64)
 
-        # respeta la antelación mínima configurable (solo aplica a urgentes/relevantes)
+        # respeta la antelación mínima configurable (solo aplica a urgentes/relevantes);
+        # base_range está ordenado, así que el corte es una búsqueda binaria
         if e.priority in ("UnI", "InU"):
-            filtered = [s for s in base_range if s >= now_slot]
+            cut = int(np.searchsorted(base_range, now_slot))
+            cur = e.current_start_slot
             # si el evento ya estaba programado antes del límite, permitir mantenerlo
-            if (
-                e.current_start_slot is not None
-                and e.current_start_slot < now_slot
-                and e.current_start_slot in base_range
-            ):
-                filtered.append(e.current_start_slot)
-            if filtered:
-                filtered = sorted(set(filtered))
-            base_range = filtered
-
-        starts = base_range
-
-        # Primero remover conflictos con fijos (el dominio real factible).
-        # Luego filtrar por preferencia sobre los candidatos ya factibles.
-        # Este orden es crítico: si se aplica el filtro de preferencia antes,
+            keep_current = False
+            if cur is not None and cur < now_slot:
+                i = int(np.searchsorted(base_range, cur))
+                keep_current = i < base_range.size and base_range[i] == cur
+            base_range = base_range[cut:]
+            if keep_current:
+                base_range = np.insert(base_range, 0, cur)
+
+        # Kernel de filtrado, en este orden:
+        #   1) días activos — verifica TODOS los días que ocupa el evento
+        #   2) conflictos con fijos (el dominio real factible)
+        #   3) preferencia con fallback de 3 niveles sobre los ya factibles:
+        #      preferidos → horario laboral (dayStart-dayEnd) → cualquier slot
+        # El orden 2 → 3 es crítico: si se aplica el filtro de preferencia antes,
         # se puede acabar con un subconjunto de slots que después quedan todos
-        # bloqueados por eventos fijos, resultando en dominio vacío.
-        if not e.overlap and fixed_blocking:
-            starts = remove_conflicting_starts(starts, e.duration_slots, fixed_blocking, buffer_for_event)
+        # bloqueados por eventos fijos, resultando en dominio vacío. El fallback
+        # garantiza que haya candidatos mientras queden slots libres.
+        # Devuelve también los slots fuera de preferencia de cada inicio (costos).
+        return filter_candidates(
+            base_range, e.duration_slots, not e.overlap,
+            blocked_cumsum, disallowed_cumsum, notpref_cumsum, notwork_cumsum,
+            has_pref, has_work,
+        )
 
-        # Preferencia con fallback de 3 niveles: preferidos → horario laboral → cualquier slot.
-        starts = filter_to_preferred_if_possible(starts, e.duration_slots)
+    # Plantillas: el dominio filtrado solo depende de la ventana, duración,
+    # solapamiento, si aplica la antelación mínima y (si está antes de now_slot)
+    # el inicio actual que se permite conservar. Eventos con la misma firma
+    # comparten la lista; los costos se calculan por evento (move depende de él).
+    template_starts: Dict[Tuple[Any, ...], Tuple[np.ndarray, np.ndarray]] = {}
+
+    for e in flex:
+        early_start = (
+            e.current_start_slot
+            if e.current_start_slot is not None and e.current_start_slot < now_slot
+            else None
+        )
+        sig = (
+            e.window, e.window_start, e.window_end, e.duration_slots, e.overlap,
+            e.priority in ("UnI", "InU"), early_start,
+        )
+        template = template_starts.get(sig)
+        if template is None:
+            template = feasible_starts(e)
+            template_starts[sig] = template
+        starts_arr, offpref_slots = template
 
         # Calcular costos para TODOS los candidatos antes de truncar.
         # Así la reducción a k=300 preserva los candidatos de MENOR COSTO,
         # no solo los temporalmente más cercanos.
-        for s in starts:
-            dist_cost = max(0, s - now_slot) * int(dist_w[e.priority])
-            offpref_slots = count_offpref_slots(s, e.duration_slots, preferred_slots)
-            offpref_cost = offpref_slots * int(offpref_w[e.priority])
-            cross_cost = int(crossday_w[e.priority]) if crosses_day(s, e.duration_slots, horizon) else 0
-            move_cost = 0
-            if e.current_start_slot is not None:
-                move_cost = 0 if s == e.current_start_slot else int(move_w[e.priority])
-            total = dist_cost + offpref_cost + cross_cost + move_cost
-            costs[(e.id, s)] = Costs(
-                total=total,
-                dist=dist_cost,
-                offpref=offpref_cost,
-                crossday=cross_cost,
-                movecost=move_cost
-            )
-
-        # Ordenar por costo ascendente y conservar los k mejores candidatos.
-        starts.sort(key=lambda s: (costs[(e.id, s)].total, s))
-        starts = starts[:300]
+        total = candidate_costs(
+            starts_arr, e.duration_slots, e.current_start_slot, now_slot, offpref_slots, slot_day,
+            *weights_by_code[e.priority_code],
+        )[0]
 
-        candidates[e.id] = starts
+        # Ordenar por costo ascendente (desempate por slot) y conservar los k mejores.
+        order = reduce_candidates(starts_arr, total)
+        candidates[e.id] = starts_arr[order].tolist()
+        cand_costs[e.id] = total[order].tolist()
 
     # Si algún evento quedó sin candidatos, márcalo unplaced
     immediate_unplaced = [{"id": ev.id, "reason": "NoFeasibleCandidates"} for ev in flex if not candidates.get(ev.id)]
     flex = [ev for ev in flex if candidates.get(ev.id)]
 
+    def build_result(chosen: Dict[str, int], summary_suffix: str = "") -> Dict[str, Any]:
+        placed = []
+        moved = []
+        unplaced = list(immediate_unplaced)
+        total_cost = 0
+        for ev in flex:
+            chosen_s = chosen.get(ev.id)
+            if chosen_s is None or chosen_s not in candidates[ev.id]:
+                unplaced.append({"id": ev.id, "reason": "NoChosenStart"})
+                continue
+            total_cost += cand_costs[ev.id][candidates[ev.id].index(chosen_s)]
+            start_dt = horizon.slot_to_dt(chosen_s)
+            end_dt = horizon.slot_to_dt(chosen_s + ev.duration_slots)
+            placed.append({
+                "id": ev.id,
+                "start": start_dt.isoformat(),
+                "end": end_dt.isoformat()
+            })
+            if ev.current_start_slot is not None and ev.current_start_slot != chosen_s:
+                moved.append({
+                    "id": ev.id,
+                    "fromStart": horizon.slot_to_dt(ev.current_start_slot).isoformat(),
+                    "toStart": start_dt.isoformat(),
+                    "reason": "RepositionedByPolicy"
+                })
+        diag = {
+            "hardConflicts": list(remote_conflicts),
+            "summary": f"Placed {len(placed)}, moved {len(moved)}, unplaced {len(unplaced)}{summary_suffix}"
+        }
+        return {"placed": placed, "moved": moved, "unplaced": unplaced, "score": int(total_cost), "diagnostics": diag}
+
+    # Asignación voraz (sin solapes por construcción). Si coloca todo, respeta
+    # remoteCapacity y cada evento quedó en un candidato de costo mínimo,
+    # iguala la cota inferior Σ min costo y es óptima: no hace falta CP-SAT.
+    def within_remote_capacity(chosen: Dict[str, int]) -> bool:
+        remote_chosen = [ev for ev in flex if ev.overlap and ev.id in chosen]
+        if not limit_remote or not remote_chosen:
+            return True
+        usage = np.zeros(horizon.total_slots + 1, dtype=np.int32)
+        for ev in remote_chosen:
+            usage[chosen[ev.id]] += 1
+            usage[chosen[ev.id] + ev.duration_slots] -= 1
+        return int((fixed_remote_usage + np.cumsum(usage[:-1])).max()) <= remote_capacity
+
+    greedy = greedy_assignment(flex, candidates, horizon.total_slots, buffer_slots)
+    if len(greedy) == len(flex) and within_remote_capacity(greedy) and all(
+        cand_costs[ev.id][candidates[ev.id].index(greedy[ev.id])] == cand_costs[ev.id][0]
+        for ev in flex
+    ):
+        return build_result(greedy, " (greedy-optimal)")
+
     # Construcción del modelo CP-SAT
     model = cp_model.CpModel()
 
+    start_vars: Dict[str, cp_model.IntVar] = {}
     x_vars: Dict[Tuple[str, int], cp_model.IntVar] = {}
+    # Objetivo como listas planas (literal, costo), sin términos de costo 0
+    obj_vars: List[cp_model.IntVar] = []
+    obj_coeffs: List[int] = []
     intervals_to_block: List[cp_model.IntervalVar] = []
+    remote_intervals: List[cp_model.IntervalVar] = []
 
-    # Variables y constraint de "exactly one" por evento
+    # Un literal por (evento, candidato) con exactly-one, más una variable
+    # entera de inicio canalizada (start_e == Σ s·x_s) para poder razonar sobre
+    # el inicio del evento directamente (simetrías, hints).
     for ev in flex:
+        domain = cp_model.Domain.FromValues(sorted(candidates[ev.id]))
+        start_e = model.NewIntVarFromDomain(domain, f"s_{ev.id}")
+        start_vars[ev.id] = start_e
         xs = []
-        for s in candidates[ev.id]:
+        for s, c in zip(candidates[ev.id], cand_costs[ev.id]):
             v = model.NewBoolVar(f"x_{ev.id}_{s}")
             x_vars[(ev.id, s)] = v
             xs.append(v)
+            if c != 0:
+                obj_vars.append(v)
+                obj_coeffs.append(c)
             # Intervalo opcional para no-overlap
             if not ev.overlap:
-                extra = buffer_slots if not ev.overlap else 0
-                start = s
-                duration = ev.duration_slots + extra
-                end = s + duration
+                duration = ev.duration_slots + buffer_slots
                 intervals_to_block.append(
-                    model.NewOptionalIntervalVar(start, duration, end, v, f"I_{ev.id}_{s}")
+                    model.NewOptionalIntervalVar(s, duration, s + duration, v, f"I_{ev.id}_{s}")
                 )
-        model.Add(sum(xs) == 1)  # exactly-one
+        if ev.overlap and limit_remote:
+            remote_intervals.append(
+                model.NewIntervalVar(start_e, ev.duration_slots, start_e + ev.duration_slots, f"R_{ev.id}")
+            )
+        model.AddExactlyOne(xs)
+        model.Add(start_e == cp_model.LinearExpr.WeightedSum(xs, candidates[ev.id]))
+
+    # Hint inicial: asignación voraz de menor costo sin solapes (parcial si
+    # algún evento no encuentra lugar).
+    for ev_id, s in greedy.items():
+        model.AddHint(start_vars[ev_id], s)
+        model.AddHint(x_vars[(ev_id, s)], 1)
 
     # Intervalos fijos que bloquean
     for f in fixed_blocking:
@@ -391,14 +546,21 @@ def solve_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
     if intervals_to_block:
         model.AddNoOverlap(intervals_to_block)
 
+    # Los flexibles que pueden solaparse comparten remoteCapacity (demanda 1
+    # cada uno) con el perfil de los fijos remotos, que entra como tramos de uso
+    # constante. Sin flexibles remotos no hay nada que decidir.
+    if limit_remote and remote_intervals:
+        demands = [1] * len(remote_intervals)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], fixed_remote_usage, [0])))).tolist()
+        for a, b in zip(edges, edges[1:]):
+            u = int(fixed_remote_usage[a])
+            if u > 0:
+                remote_intervals.append(model.NewIntervalVar(a, b - a, b, f"FR_{a}"))
+                demands.append(u)
+        model.AddCumulative(remote_intervals, demands, remote_capacity)
+
     # Objetivo
-    obj_terms = []
-    for ev in flex:
-        for s in candidates[ev.id]:
-            c = costs[(ev.id, s)].total
-            if c != 0:
-                obj_terms.append(c * x_vars[(ev.id, s)])
-    model.Minimize(sum(obj_terms) if obj_terms else 0)
+    model.Minimize(cp_model.LinearExpr.WeightedSum(obj_vars, obj_coeffs))
 
     # Resolver — timeout adaptativo según tamaño del problema
     num_vars = sum(len(candidates[ev.id]) for ev in flex)
@@ -407,53 +569,28 @@ def solve_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = time_limit
     solver.parameters.num_search_workers = 8
+    if SOLVER_TUNING:
+        # Relajación lineal completa: el objetivo es lineal sobre los literales
+        # y el NoOverlap de intervalos opcionales aporta cortes útiles.
+        solver.parameters.linearization_level = 2
+        solver.parameters.cp_model_presolve = True
+        solver.parameters.symmetry_level = 2
+        solver.parameters.random_seed = SOLVER_RANDOM_SEED
+        # En modelos chicos más workers solo agregan sincronización.
+        if num_vars < 500:
+            solver.parameters.num_search_workers = min(4, os.cpu_count() or 1)
 
     status = solver.Solve(model)
 
-    placed = []
-    moved = []
-    unplaced = list(immediate_unplaced)
-    score = None
-
     if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        total_cost = 0
-        for ev in flex:
-            chosen_s = None
-            for s in candidates[ev.id]:
-                if solver.Value(x_vars[(ev.id, s)]) == 1:
-                    chosen_s = s
-                    total_cost += costs[(ev.id, s)].total
-                    break
-            if chosen_s is None:
-                unplaced.append({"id": ev.id, "reason": "NoChosenStart"})
-            else:
-                start_dt = horizon.slot_to_dt(chosen_s)
-                end_dt = horizon.slot_to_dt(chosen_s + ev.duration_slots)
-                placed.append({
-                    "id": ev.id,
-                    "start": start_dt.isoformat(),
-                    "end": end_dt.isoformat()
-                })
-                if ev.current_start_slot is not None and ev.current_start_slot != chosen_s:
-                    moved.append({
-                        "id": ev.id,
-                        "fromStart": horizon.slot_to_dt(ev.current_start_slot).isoformat(),
-                        "toStart": start_dt.isoformat(),
-                        "reason": "RepositionedByPolicy"
-                    })
-        score = int(total_cost)
-        diag = {
-            "hardConflicts": [],
-            "summary": f"Placed {len(placed)}, moved {len(moved)}, unplaced {len(unplaced)}"
-        }
-        return {"placed": placed, "moved": moved, "unplaced": unplaced, "score": score, "diagnostics": diag}
+        return build_result({ev.id: int(solver.Value(start_vars[ev.id])) for ev in flex})
 
     # No hay solución: distinguir entre infactible y timeout
     if status == cp_model.INFEASIBLE:
-        diag = {"hardConflicts": ["Infeasible model"], "summary": "INFEASIBLE: sin solución posible"}
+        diag = {"hardConflicts": remote_conflicts + ["Infeasible model"], "summary": "INFEASIBLE: sin solución posible"}
     else:
-        diag = {"hardConflicts": [], "summary": "TIMEOUT: solver no encontró solución en el tiempo límite"}
-    return {"placed": [], "moved": [], "unplaced": unplaced, "score": None, "diagnostics": diag}
+        diag = {"hardConflicts": remote_conflicts, "summary": "TIMEOUT: solver no encontró solución en el tiempo límite"}
+    return {"placed": [], "moved": [], "unplaced": immediate_unplaced, "score": None, "diagnostics": diag}
 
 
 # -----------------------------
@@ -466,14 +603,19 @@ def main():
     args = ap.parse_args()
 
     if args.json:
-        with open(args.json, "r", encoding="utf-8") as f:
-            payload = json.load(f)
+        with open(args.json, "rb") as f:
+            raw = f.read()
     else:
-        payload = json.load(sys.stdin)
+        raw = sys.stdin.buffer.read()
+    payload = orjson.loads(raw) if orjson is not None else json.loads(raw)
 
     result = solve_schedule(payload)
-    json.dump(result, sys.stdout, ensure_ascii=False)
-    sys.stdout.write("\n")
+    if orjson is not None:
+        sys.stdout.buffer.write(orjson.dumps(result) + b"\n")
+        sys.stdout.buffer.flush()
+    else:
+        json.dump(result, sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
 
 
 if __name__ == "__main__":
@@ -9,34 +9,70 @@ Utilidades compartidas entre solver.py y solver_debug.py.
 Incluye:
 - Clase Horizon (manejo de slots de tiempo)
 - Funciones de parsing de fechas y configuración
-- Dataclasses: FixedEvent, FlexibleEvent, Costs
+- Dataclasses: FixedEvent, FlexibleEvent
 - Funciones de candidatos y costos
+- Sumas prefijas sobre máscaras de slots (consultas O(1) por ventana)
 """
 
 from __future__ import annotations
 
 import math
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+import numpy as np
+
 
 # =============================
 # Utilidades de tiempo / slots
 # =============================
 
-@dataclass
+MINUTES_PER_DAY = 24 * 60
+
+def _wall_us(dt: datetime) -> int:
+    """Hora de pared (ignora el offset) en microsegundos desde el ordinal 0."""
+    return (
+        ((dt.toordinal() * 24 + dt.hour) * 60 + dt.minute) * 60 + dt.second
+    ) * 1_000_000 + dt.microsecond
+
+
+@dataclass(slots=True)
 class Horizon:
     tz: ZoneInfo
     start_dt: datetime
     end_dt: datetime
     slot_minutes: int
+    # Máximo de slots hacia adelante (desde now_slot) para ventanas amplias; None = sin límite
+    max_lookahead: Optional[int] = None
+    # Cacheados en __post_init__ para convertir con aritmética entera
+    _start_us: int = field(init=False, repr=False)
+    _slot_us: int = field(init=False, repr=False)
+    _total_slots: int = field(init=False, repr=False)
+    # Minutos desde la medianoche del primer día hasta start_dt
+    day0_offset: int = field(init=False)
 
     def __post_init__(self):
         assert self.start_dt.tzinfo is not None and self.end_dt.tzinfo is not None
         assert self.start_dt <= self.end_dt
         assert self.slot_minutes > 0
+        # Igual que restar datetimes con el mismo tzinfo: diferencia en hora de
+        # pared, consistente con slot_to_dt (start_dt + s * slot_delta).
+        self._start_us = _wall_us(self.start_dt.astimezone(self.tz))
+        self._slot_us = self.slot_minutes * 60 * 1_000_000
+        diff = self.end_dt - self.start_dt
+        self._total_slots = math.ceil(diff.total_seconds() / (self.slot_minutes * 60))
+        self.day0_offset = self.start_dt.hour * 60 + self.start_dt.minute
+
+    def day_offsets(self, slots: np.ndarray) -> np.ndarray:
+        """
+        Día (0 = día de start_dt) en el que cae cada slot. Los slots avanzan en
+        hora de pared (ver slot_to_dt), así que es una división entera exacta
+        también con cambios de horario.
+        """
+        return (self.day0_offset + np.asarray(slots, dtype=np.int64) * self.slot_minutes) // MINUTES_PER_DAY
 
     @property
     def slot_delta(self) -> timedelta:
@@ -46,10 +82,7 @@ class Horizon:
         # redondea hacia abajo al inicio de slot
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=self.tz)
-        dt = dt.astimezone(self.tz)
-        diff = dt - self.start_dt
-        slots = diff.total_seconds() / (self.slot_minutes * 60)
-        return int(math.floor(slots))
+        return (_wall_us(dt.astimezone(self.tz)) - self._start_us) // self._slot_us
 
     def dt_to_next_slot(self, dt: datetime) -> int:
         # redondea hacia arriba al siguiente slot
@@ -61,6 +94,21 @@ class Horizon:
             return base + 1
         return base
 
+    def isos_to_slots(self, isos: List[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        (slot piso, slot techo) de cada ISO distinto: se parsea una sola vez y
+        la conversión a slots es una división entera vectorizada.
+        """
+        unique = list(dict.fromkeys(isos))
+        rel = np.fromiter(
+            (_wall_us(parse_iso_localized(v, self.tz)) for v in unique),
+            dtype=np.int64,
+            count=len(unique),
+        ) - self._start_us
+        floor = rel // self._slot_us
+        ceil = -((-rel) // self._slot_us)
+        return dict(zip(unique, zip(floor.tolist(), ceil.tolist())))
+
     def slot_to_dt(self, s: int) -> datetime:
         return self.start_dt + s * self.slot_delta
 
@@ -72,17 +120,20 @@ class Horizon:
         if self.slot_to_dt(sb) < b:
             sb += 1
         sa = max(sa, 0)
-        sb = min(sb, self.total_slots)
+        # nunca antes de sa: un rango vacío no debe dar índices negativos al rebanar
+        sb = min(max(sb, sa), self.total_slots)
         return range(sa, sb)
 
     @property
     def total_slots(self) -> int:
-        diff = self.end_dt - self.start_dt
-        return math.ceil(diff.total_seconds() / (self.slot_minutes * 60))
+        return self._total_slots
 
 
+@lru_cache(maxsize=4096)
 def parse_iso_localized(s: str, tz: ZoneInfo) -> datetime:
-    # Acepta ISO con o sin tz; si no trae tz, asumir tz del usuario
+    # Acepta ISO con o sin tz; si no trae tz, asumir tz del usuario.
+    # Memoizada: las ventanas SEMANA/MES y los rangos se repiten entre eventos
+    # (datetime y ZoneInfo son inmutables, así que compartir el resultado es seguro).
     dt = datetime.fromisoformat(s.replace("Z", "+00:00")) if s else None
     if dt is None:
         raise ValueError(f"Fecha inválida: {s!r}")
@@ -91,11 +142,6 @@ def parse_iso_localized(s: str, tz: ZoneInfo) -> datetime:
     return dt.astimezone(tz)
 
 
-def day_index(dt: datetime) -> Tuple[int, int, int]:
-    dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
-    return (dt.year, dt.month, dt.day)
-
-
 def parse_hhmm(value: Any, default: Tuple[int, int]) -> Tuple[int, int]:
     try:
         if isinstance(value, str):
@@ -129,7 +175,7 @@ def safe_positive_int(value: Any, default: int = 0) -> int:
 # Estructuras de eventos
 # =============================
 
-@dataclass
+@dataclass(slots=True)
 class FixedEvent:
     id: str
     start_slot: int
@@ -137,70 +183,196 @@ class FixedEvent:
     blocks_capacity: bool
 
 
-@dataclass
+# Prioridades de eventos flexibles; su índice es el código entero con el que
+# se indexan las tablas de pesos (ver weight_table). Una prioridad que no esté
+# aquí recibe el siguiente código libre la primera vez que aparece.
+PRIORITIES: List[str] = ["UnI", "InU", "IyU", "NiNi"]
+PRIORITY_CODE: Dict[str, int] = {p: i for i, p in enumerate(PRIORITIES)}
+
+
+def priority_code(priority: str) -> int:
+    code = PRIORITY_CODE.get(priority)
+    if code is None:
+        code = PRIORITY_CODE[priority] = len(PRIORITIES)
+        PRIORITIES.append(priority)
+    return code
+
+
+@dataclass(slots=True)
 class FlexibleEvent:
     id: str
-    priority: str  # "UnI" | "InU"
+    priority: str  # "UnI" | "InU" | "IyU" | "NiNi"
     duration_slots: int
     overlap: bool  # True si puede solaparse
     current_start_slot: Optional[int]  # para "movable"
     window: str    # PRONTO | SEMANA | MES | RANGO
     window_start: Optional[int]
     window_end: Optional[int]
+    priority_code: int = field(init=False)  # índice en PRIORITIES
 
-
-@dataclass
-class Costs:
-    total: int
-    dist: int
-    offpref: int
-    crossday: int
-    movecost: int
+    def __post_init__(self):
+        self.priority_code = priority_code(self.priority)
 
 
 # =============================
-# Generación de candidatos
+# Máscaras de slots
 # =============================
 
-def is_weekend(dt: datetime) -> bool:
-    # 0=Mon..6=Sun
-    return dt.weekday() >= 5
+def prefix_sum(mask: np.ndarray) -> np.ndarray:
+    """
+    Suma acumulada con un 0 inicial: out[b] - out[a] = número de 1s en mask[a:b].
+    """
+    out = np.zeros(len(mask) + 1, dtype=np.int32)
+    np.cumsum(mask, dtype=np.int32, out=out[1:])
+    return out
 
 
-def expand_window_slots(ev: FlexibleEvent, horizon: Horizon, now_slot: int) -> range:
+def slot_calendar(horizon: Horizon) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Devuelve rango bruto [a,b) de slots donde puede empezar, según la ventana.
-    El filtrado fino (preferencias, fixed, etc.) se hace después.
+    Día de la semana (0=lun) y ordinal de día calendario de cada slot.
+    Es una división entera por slot (ver Horizon.day_offsets).
     """
-    if ev.window == "PRONTO":
-        a = max(now_slot, 0)
-        b = min(now_slot + math.ceil((48 * 60) / horizon.slot_minutes), horizon.total_slots)
-        return range(a, b)
+    start = horizon.start_dt
+    day_offset = horizon.day_offsets(np.arange(horizon.total_slots, dtype=np.int64))
+    slot_day = (start.toordinal() + day_offset).astype(np.int32)
+    slot_weekday = ((start.weekday() + day_offset) % 7).astype(np.uint8)
+    return slot_weekday, slot_day
 
-    if ev.window == "SEMANA":
-        # lunes 00:00 a domingo 23:59 de la semana actual (ISO)
-        start = horizon.start_dt
-        weekday = start.isoweekday()  # 1..7 (lun..dom)
-        monday = start - timedelta(days=weekday - 1)
-        monday = monday.replace(hour=0, minute=0, second=0, microsecond=0)
-        sunday_end = monday + timedelta(days=7)
-        a = max(horizon.dt_to_slot(monday), 0)
-        b = min(horizon.dt_to_slot(sunday_end), horizon.total_slots)
-        return range(a, b)
 
-    if ev.window == "MES":
-        start = horizon.start_dt
-        month_start = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        if start.month == 12:
-            next_month = start.replace(year=start.year + 1, month=1, day=1,
-                                       hour=0, minute=0, second=0, microsecond=0)
-        else:
-            next_month = start.replace(month=start.month + 1, day=1,
-                                       hour=0, minute=0, second=0, microsecond=0)
-        a = max(horizon.dt_to_slot(month_start), 0)
-        b = min(horizon.dt_to_slot(next_month), horizon.total_slots)
-        return range(a, b)
+def ranges_mask(horizon: Horizon, ranges: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Máscara (uint8) de los rangos {"start", "end"} (ISO) del payload: los
+    mismos slots que slots_in_interval por rango, con todos los ISO
+    convertidos a slots en un solo paso (ver Horizon.isos_to_slots).
+    """
+    n = horizon.total_slots
+    mask = np.zeros(n, dtype=np.uint8)
+    iso_slots = horizon.isos_to_slots([r[k] for r in ranges for k in ("start", "end")])
+    for r in ranges:
+        sa = max(iso_slots[r["start"]][0], 0)
+        sb = min(iso_slots[r["end"]][1], n)
+        if sb > sa:
+            mask[sa:sb] = 1
+    return mask
+
+
+def inactive_day_mask(slot_weekday: np.ndarray, allowed_days: Set[int]) -> np.ndarray:
+    """
+    Máscara de slots en días no activos (los fines de semana son el caso
+    habitual). Una tabla de 7 entradas indexada por el día de cada slot: sin
+    comparaciones por slot ni búsqueda en el conjunto.
+    """
+    inactive = np.ones(7, dtype=np.bool_)
+    inactive[list(allowed_days)] = False
+    return inactive[slot_weekday]
+
+
+def working_hours_mask(
+    horizon: Horizon,
+    allowed_days: Set[int],
+    day_start: Tuple[int, int],
+    day_end: Tuple[int, int],
+) -> np.ndarray:
+    """
+    Máscara (uint8) del horario laboral: [dayStart, dayEnd) en cada día activo;
+    si dayEnd <= dayStart, el día completo. Equivale a recorrer los días con
+    slots_in_interval, pero con aritmética entera en minutos de pared.
+    """
+    n = horizon.total_slots
+    mask = np.zeros(n, dtype=np.uint8)
+    if n == 0:
+        return mask
+    sm = horizon.slot_minutes
+    start = horizon.start_dt
+    # Minutos (con fracción) de start_dt desde su medianoche; así a - start es exacto
+    day0 = horizon.day0_offset + (start.second + start.microsecond / 1_000_000) / 60
+    a_min = day_start[0] * 60 + day_start[1]
+    b_min = day_end[0] * 60 + day_end[1]
+    if b_min <= a_min:
+        a_min, b_min = 0, MINUTES_PER_DAY
+    # Días cuya medianoche cae antes de end_dt (mismo recorrido que el bucle por días)
+    end_rel = (horizon.end_dt - start).total_seconds() / 60
+    n_days = math.ceil((end_rel + day0) / MINUTES_PER_DAY)
+    weekday0 = start.weekday()
+    for d in range(n_days):
+        if (weekday0 + d) % 7 not in allowed_days:
+            continue
+        base = d * MINUTES_PER_DAY - day0
+        sa = max(math.floor((base + a_min) / sm), 0)
+        sb = min(math.ceil((base + b_min) / sm), n)
+        if sb > sa:
+            mask[sa:sb] = 1
+    return mask
+
+
+def blocked_prefix_sum(fixed: List[FixedEvent], total_slots: int, buffer_slots: int = 0) -> np.ndarray:
+    """
+    Suma prefija de la máscara de slots ocupados por fijos que SI bloquean
+    capacidad, ensanchados `buffer_slots` a cada lado.
+    """
+    blocked = np.zeros(total_slots, dtype=np.uint8)
+    for f in fixed:
+        if not f.blocks_capacity:
+            continue
+        blocked[max(0, f.start_slot - buffer_slots):min(total_slots, f.end_slot + buffer_slots)] = 1
+    return prefix_sum(blocked)
 
+
+# =============================
+# Generación de candidatos
+# =============================
+
+def canonical_windows(horizon: Horizon) -> Tuple[range, range, int]:
+    """
+    Rangos de las ventanas que solo dependen del horizonte: (semana, mes,
+    largo de PRONTO en slots). Se calculan una vez por resolución.
+    """
+    start = horizon.start_dt
+
+    # SEMANA: lunes 00:00 a domingo 23:59 de la semana actual (ISO)
+    weekday = start.isoweekday()  # 1..7 (lun..dom)
+    monday = start - timedelta(days=weekday - 1)
+    monday = monday.replace(hour=0, minute=0, second=0, microsecond=0)
+    sunday_end = monday + timedelta(days=7)
+    semana_range = range(
+        max(horizon.dt_to_slot(monday), 0),
+        min(horizon.dt_to_slot(sunday_end), horizon.total_slots),
+    )
+
+    # MES: del día 1 del mes actual al día 1 del siguiente
+    month_start = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        next_month = start.replace(year=start.year + 1, month=1, day=1,
+                                   hour=0, minute=0, second=0, microsecond=0)
+    else:
+        next_month = start.replace(month=start.month + 1, day=1,
+                                   hour=0, minute=0, second=0, microsecond=0)
+    mes_range = range(
+        max(horizon.dt_to_slot(month_start), 0),
+        min(horizon.dt_to_slot(next_month), horizon.total_slots),
+    )
+
+    pronto_len = math.ceil((48 * 60) / horizon.slot_minutes)
+    return semana_range, mes_range, pronto_len
+
+
+def expand_window_slots(
+    ev: FlexibleEvent,
+    horizon: Horizon,
+    now_slot: int,
+    semana_range: range,
+    mes_range: range,
+    pronto_len: int,
+) -> range:
+    """
+    Devuelve rango bruto [a,b) de slots donde puede empezar, según la ventana.
+    SEMANA/MES/PRONTO vienen precalculados (ver canonical_windows).
+    El filtrado fino (preferencias, fixed, etc.) se hace después.
+
+    Si el horizonte trae max_lookahead, las ventanas amplias (todas menos RANGO,
+    que es explícita) se recortan a now_slot + max_lookahead. Es una heurística:
+    achica el dominio sin cambiar la factibilidad de los candidatos que quedan.
+    """
     if ev.window == "RANGO":
         # YA VIENEN COMO ÍNDICES DE SLOT (ints) desde solve_schedule
         if ev.window_start is None or ev.window_end is None:
@@ -209,57 +381,111 @@ def expand_window_slots(ev: FlexibleEvent, horizon: Horizon, now_slot: int) -> r
         b = min(int(ev.window_end), horizon.total_slots)
         return range(a, b)
 
-    # Sin ventana específica: todo el horizonte
-    return range(0, horizon.total_slots)
-
+    if ev.window == "PRONTO":
+        rng = range(max(now_slot, 0), min(now_slot + pronto_len, horizon.total_slots))
+    elif ev.window == "SEMANA":
+        rng = semana_range
+    elif ev.window == "MES":
+        rng = mes_range
+    else:
+        # Sin ventana específica: todo el horizonte
+        rng = range(0, horizon.total_slots)
 
-def remove_conflicting_starts(
-    starts: List[int], dur: int, fixed: List[FixedEvent], buffer_slots: int = 0
-) -> List[int]:
-    """
-    Filtra starts que chocarían con intervalos fijos que SI bloquean capacidad.
-    """
-    if not fixed:
-        return starts
-    out = []
-    for s in starts:
-        event_start = s
-        event_end = s + dur
-        conflict = False
-        for f in fixed:
-            if not f.blocks_capacity:
-                continue
-            if not (
-                event_end + buffer_slots <= f.start_slot
-                or event_start >= f.end_slot + buffer_slots
-            ):
-                conflict = True
-                break
-        if not conflict:
-            out.append(s)
-    return out
+    if horizon.max_lookahead is not None:
+        rng = range(rng.start, min(rng.stop, max(now_slot, 0) + horizon.max_lookahead))
+    return rng
 
 
-def reduce_candidates(priority: str, starts: List[int], k: int = 300) -> List[int]:
+def reduce_candidates(starts: np.ndarray, total: np.ndarray, k: int = 300) -> np.ndarray:
     """
-    Para performance: limitamos candidatos.
-    - UnI: prioriza los más tempranos.
-    - InU: similar.
+    Para performance: limitamos candidatos a los k de menor costo.
+    Devuelve los índices ordenados por (costo total, slot). Con más de k
+    candidatos se hace una selección parcial y solo se ordenan los elegidos.
     """
-    return starts[:k]
+    if starts.size <= k:
+        return np.lexsort((starts, total))
+    # Clave única que ordena igual que (total, slot): los slots son >= 0 y distintos
+    key = total * (int(starts.max()) + 1) + starts
+    top = np.argpartition(key, k - 1)[:k]
+    return top[np.argsort(key[top])]
 
 
 # =============================
 # Costos
 # =============================
 
-def count_offpref_slots(s: int, dur: int, preferred_set: Set[int]) -> int:
-    return sum(1 for t in range(s, s + dur) if t not in preferred_set)
+# Componentes de costo, en el orden de las columnas de weight_table
+WEIGHT_KEYS: Tuple[str, ...] = ("distancePerSlot", "offPreferencePerSlot", "crossDayPerEvent", "move")
+
 
+def weight_table(weights: Dict[str, Dict[str, Any]], codes: Iterable[int]) -> np.ndarray:
+    """
+    Pesos del payload como tabla [código de prioridad, componente] (columnas
+    en el orden de WEIGHT_KEYS): por evento se lee una fila en vez de cuatro
+    diccionarios por nombre de prioridad. Solo se llenan las filas de `codes`
+    (las prioridades en uso); si a una le falta un peso se lanza KeyError.
+    """
+    table = np.zeros((len(PRIORITIES), len(WEIGHT_KEYS)), dtype=np.int64)
+    for c in set(codes):
+        table[c] = [int(weights[k][PRIORITIES[c]]) for k in WEIGHT_KEYS]
+    return table
+
+
+def candidate_costs(
+    starts: List[int],
+    dur: int,
+    current_start_slot: Optional[int],
+    now_slot: int,
+    offpref_slots: np.ndarray,
+    slot_day: np.ndarray,
+    dist_w: int,
+    offpref_w: int,
+    crossday_w: int,
+    move_w: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Costos de todos los candidatos de un evento en un solo paso vectorizado.
+    `offpref_slots` (paralelo a `starts`) es el conteo que ya calculó el
+    filtrado de preferencia (ver _solver_kernels.filter_candidates).
+    Devuelve (total, dist, offpref, crossday, move), paralelos a `starts`.
+    """
+    starts_arr = np.asarray(starts, dtype=np.int64)
+    dist = np.maximum(0, starts_arr - now_slot) * dist_w
+    offpref = offpref_slots * offpref_w
+    crossday = (slot_day[starts_arr + dur - 1] != slot_day[starts_arr]).astype(np.int64) * crossday_w
+    if current_start_slot is None:
+        move = np.zeros_like(starts_arr)
+    else:
+        move = np.where(starts_arr == current_start_slot, 0, move_w)
+    total = dist + offpref + crossday + move
+    return total, dist, offpref, crossday, move
 
-def crosses_day(s: int, dur: int, horizon: Horizon) -> int:
-    if dur <= 0:
-        return 0
-    d1 = day_index(horizon.slot_to_dt(s))
-    d2 = day_index(horizon.slot_to_dt(s + dur - 1))
-    return 0 if d1 == d2 else 1
+
+# =============================
+# Asignación voraz
+# =============================
+
+def greedy_assignment(
+    flex: List[FlexibleEvent],
+    candidates: Dict[str, List[int]],
+    total_slots: int,
+    buffer_slots: int = 0,
+) -> Dict[str, int]:
+    """
+    Asignación voraz: urgentes primero y, a igual prioridad, los más largos.
+    Cada evento toma su primer candidato (vienen ordenados por costo) que no
+    choque con lo ya colocado. Los que no encuentran lugar quedan fuera.
+    """
+    occupied = np.zeros(total_slots, dtype=bool)
+    chosen: Dict[str, int] = {}
+    for ev in sorted(flex, key=lambda e: (e.priority_code, -e.duration_slots)):
+        span = ev.duration_slots + buffer_slots
+        for s in candidates.get(ev.id, []):
+            if ev.overlap:
+                chosen[ev.id] = s
+                break
+            if not occupied[s:s + span].any():
+                occupied[s:s + span] = True
+                chosen[ev.id] = s
+                break
+    return chosen
@@ -8,6 +8,7 @@ Herramienta de depuración para el solver CSP de Agenda Inteligente.
 
 Uso:
     python solver_debug.py caso.json
+    python solver_debug.py caso.json --full   # JSON completo con todos los candidatos
 
 - Llama a tu solver (solve_schedule(payload)).
 - Reconstruye el horizonte, los eventos fijos y flexibles.
@@ -24,10 +25,14 @@ import sys
 import json
 import math
 import argparse
-from typing import Any, Dict, List, Tuple, Optional, Set
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+import numpy as np
+
+from _solver_kernels import filter_candidates
 from solver_common import (
     Horizon,
     parse_iso_localized,
@@ -35,12 +40,16 @@ from solver_common import (
     safe_positive_int,
     FixedEvent,
     FlexibleEvent,
-    Costs,
+    canonical_windows,
     expand_window_slots,
-    remove_conflicting_starts,
+    slot_calendar,
+    inactive_day_mask,
+    working_hours_mask,
+    ranges_mask,
     reduce_candidates,
-    count_offpref_slots,
-    crosses_day,
+    prefix_sum,
+    candidate_costs,
+    weight_table,
 )
 
 # 🔴 IMPORTANTE: ajusta este import al nombre de tu archivo del solver
@@ -48,6 +57,68 @@ from solver_common import (
 import solver as solver_csp # <= CAMBIA ESTO AL NOMBRE REAL
 
 
+# =============================
+# Candidatos (vista perezosa)
+# =============================
+
+@dataclass(slots=True)
+class DebugCandidates:
+    """
+    Candidatos de un evento como arreglos paralelos, ordenados por costo.
+    El dict de cada candidato (con sus ISO) se arma solo al pedirlo con
+    format(i); to_list() expande todos (p. ej. para volcar JSON con --full).
+    `slot_iso` convierte un slot a ISO y se comparte entre eventos (memoizada).
+    """
+    slot_iso: Callable[[int], str]
+    duration_slots: int
+    slots: np.ndarray
+    costs: Dict[str, np.ndarray]
+    chosen_slot: Optional[int]
+
+    def __len__(self) -> int:
+        return int(self.slots.size)
+
+    def index_of(self, slot: Optional[int]) -> Optional[int]:
+        if slot is None:
+            return None
+        hit = np.flatnonzero(self.slots == slot)
+        return int(hit[0]) if hit.size else None
+
+    def _candidate(self, s: int, total: int, dist: int, offpref: int, crossday: int, move: int) -> Dict[str, Any]:
+        return {
+            "slot": s,
+            "startISO": self.slot_iso(s),
+            "endISO": self.slot_iso(s + self.duration_slots),
+            "totalCost": total,
+            "breakdown": {
+                "distance": dist,
+                "offPreference": offpref,
+                "crossDay": crossday,
+                "move": move,
+            },
+            "selected": (s == self.chosen_slot),
+        }
+
+    def format(self, i: int) -> Dict[str, Any]:
+        c = self.costs
+        return self._candidate(
+            int(self.slots[i]), int(c["total"][i]), int(c["distance"][i]),
+            int(c["offPreference"][i]), int(c["crossDay"][i]), int(c["move"][i]),
+        )
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        if not len(self):
+            return []
+        c = self.costs
+        return [
+            self._candidate(*row)
+            for row in zip(
+                self.slots.tolist(), c["total"].tolist(), c["distance"].tolist(),
+                c["offPreference"].tolist(), c["crossDay"].tolist(), c["move"].tolist(),
+            )
+        ]
+
+
 # =============================
 # Reconstrucción de dominios
 # =============================
@@ -69,9 +140,13 @@ def build_debug_info(payload: Dict[str, Any],
 
     start_dt = parse_iso_localized(h["start"], tz)
     end_dt = parse_iso_localized(h["end"], tz)
-    horizon = Horizon(tz=tz, start_dt=start_dt, end_dt=end_dt, slot_minutes=slot_minutes)
-
     policy = payload.get("policy", {})
+    # Heurística opcional: acota las ventanas amplias a now_slot + maxLookaheadSlots
+    max_lookahead = safe_positive_int(policy.get("maxLookaheadSlots"), 0) or None
+    horizon = Horizon(
+        tz=tz, start_dt=start_dt, end_dt=end_dt, slot_minutes=slot_minutes, max_lookahead=max_lookahead
+    )
+
     allowed_days = set()
     for d in policy.get("activeDays", []):
         try:
@@ -93,109 +168,82 @@ def build_debug_info(payload: Dict[str, Any],
     now_local = datetime.now(tz)
     now_slot = max(0, horizon.dt_to_next_slot(now_local + timedelta(minutes=lead_minutes)))
 
-    # preferred slots: igual que en el solver
+    # Ventanas SEMANA/MES/PRONTO: dependen solo del horizonte
+    semana_range, mes_range, pronto_len = canonical_windows(horizon)
+
+    # working_mask: horario laboral (dayStart-dayEnd en días activos).
+    # Nivel 2 del fallback de preferencia y base de preferred_mask si no hay rangos.
+    working_mask = working_hours_mask(horizon, allowed_days, day_start_tuple, day_end_tuple)
+
+    # preferred_mask: igual que en el solver (rangos expandidos o, si no hay, horario laboral)
     preferred_ranges = payload.get("availability", {}).get("preferred", [])
-    preferred_slots: Set[int] = set()
     if preferred_ranges:
-        for r in preferred_ranges:
-            a = parse_iso_localized(r["start"], tz)
-            b = parse_iso_localized(r["end"], tz)
-            preferred_slots.update(horizon.slots_in_interval(a, b))
+        preferred_mask = ranges_mask(horizon, preferred_ranges)
     else:
-        cur = horizon.start_dt
-        while cur < horizon.end_dt:
-            dow = cur.weekday()
-            if dow in allowed_days:
-                a = cur.replace(
-                    hour=day_start_tuple[0],
-                    minute=day_start_tuple[1],
-                    second=0,
-                    microsecond=0
-                )
-                b = cur.replace(
-                    hour=day_end_tuple[0],
-                    minute=day_end_tuple[1],
-                    second=0,
-                    microsecond=0
-                )
-                if b <= a:
-                    a = cur.replace(hour=0, minute=0, second=0, microsecond=0)
-                    b = (a + timedelta(days=1))
-                preferred_slots.update(horizon.slots_in_interval(a, b))
-            cur = (cur + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-
-    # working_hours_slots: siempre calculado (nivel 2 de fallback de preferencia)
-    working_hours_slots: Set[int] = set()
-    cur = horizon.start_dt
-    while cur < horizon.end_dt:
-        dow = cur.weekday()
-        if dow in allowed_days:
-            a = cur.replace(hour=day_start_tuple[0], minute=day_start_tuple[1], second=0, microsecond=0)
-            b = cur.replace(hour=day_end_tuple[0], minute=day_end_tuple[1], second=0, microsecond=0)
-            if b <= a:
-                a = cur.replace(hour=0, minute=0, second=0, microsecond=0)
-                b = (a + timedelta(days=1))
-            working_hours_slots.update(horizon.slots_in_interval(a, b))
-        cur = (cur + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-
-    # Fixed events (igual que en el solver)
-    fixed_json = payload["events"].get("fixed", []) + payload["events"].get("newFixed", [])
+        preferred_mask = working_mask.copy()
+
+    # Sumas prefijas de los slots NO preferidos / fuera de horario laboral:
+    # slots fuera de preferencia en [s, s+dur) = cs[s+dur] - cs[s].
+    notpref_cumsum = prefix_sum(1 - preferred_mask)
+    notwork_cumsum = prefix_sum(1 - working_mask)
+
+    # Calendario por slot (día de la semana / día) y slots en días no activos
+    slot_weekday, slot_day = slot_calendar(horizon)
+    disallowed_cumsum = prefix_sum(inactive_day_mask(slot_weekday, allowed_days))
+
+    # Marcas de tiempo de todos los eventos (igual que en el solver): cada ISO
+    # distinto se parsea una vez y se convierte a slots (piso, techo) en un paso.
+    events_json = payload["events"]
+    fixed_json = events_json.get("fixed", []) + events_json.get("newFixed", [])
+    movable_json = events_json.get("movable", [])
+    new_json = events_json.get("new", [])
+    iso_slots = horizon.isos_to_slots(
+        [f[k] for f in fixed_json for k in ("start", "end")]
+        + [m[k] for m in movable_json for k in ("currentStart", "windowStart", "windowEnd") if m.get(k)]
+        + [n[k] for n in new_json for k in ("windowStart", "windowEnd") if n.get(k)]
+    )
+
+    # Fixed events. De paso se marcan los slots que bloquean capacidad (con
+    # buffer a cada lado), para filtrar inicios en O(1) por candidato.
     fixed: List[FixedEvent] = []
+    blocked = np.zeros(horizon.total_slots, dtype=np.uint8)
     for f in fixed_json:
-        start = parse_iso_localized(f["start"], tz)
-        end = parse_iso_localized(f["end"], tz)
-        s = horizon.dt_to_slot(start)
-        e = horizon.dt_to_slot(end)
-        if horizon.slot_to_dt(e) < end:
-            e += 1
-        s = max(s, 0)
-        e = min(e, horizon.total_slots)
+        s = max(iso_slots[f["start"]][0], 0)
+        e = min(iso_slots[f["end"]][1], horizon.total_slots)
         if e <= s:
             continue
-        fixed.append(FixedEvent(
-            id=f["id"],
-            start_slot=s,
-            end_slot=e,
-            blocks_capacity=bool(
-                f.get("isInPerson", True) and (not f.get("canOverlap", False)) and f.get("blocksCapacity", True)
-            )
-        ))
+        blocks_capacity = bool(
+            f.get("isInPerson", True) and (not f.get("canOverlap", False)) and f.get("blocksCapacity", True)
+        )
+        fixed.append(FixedEvent(id=f["id"], start_slot=s, end_slot=e, blocks_capacity=blocks_capacity))
+        if blocks_capacity:
+            blocked[max(0, s - buffer_slots):e + buffer_slots] = 1
 
     # Pesos (igual que solver)
     weights = payload["weights"]
-    move_w = weights["move"]
-    dist_w = weights["distancePerSlot"]
-    offpref_w = weights["offPreferencePerSlot"]
-    crossday_w = weights["crossDayPerEvent"]
-
     flex: List[FlexibleEvent] = []
 
     def duration_to_slots(mins: int) -> int:
         return max(1, math.ceil(mins / slot_minutes))
 
+    def slot_of(ev_json: Dict[str, Any], key: str) -> Optional[int]:
+        return iso_slots[ev_json[key]][0] if ev_json.get(key) else None
+
     # Movable
-    for m in payload["events"].get("movable", []):
-        cur_start_slot = None
-        if m.get("currentStart"):
-            cur_dt = parse_iso_localized(m["currentStart"], tz)
-            cur_start_slot = horizon.dt_to_slot(cur_dt)
-        wstart = parse_iso_localized(m["windowStart"], tz).astimezone(tz) if m.get("windowStart") else None
-        wend = parse_iso_localized(m["windowEnd"], tz).astimezone(tz) if m.get("windowEnd") else None
+    for m in movable_json:
         flex.append(FlexibleEvent(
             id=m["id"],
             priority=m["priority"],
             duration_slots=duration_to_slots(int(m["durationMin"])),
             overlap=(not m.get("isInPerson", True)) or m.get("canOverlap", False),
-            current_start_slot=cur_start_slot,
+            current_start_slot=slot_of(m, "currentStart"),
             window=m["window"],
-            window_start=horizon.dt_to_slot(wstart) if wstart else None,
-            window_end=horizon.dt_to_slot(wend) if wend else None
+            window_start=slot_of(m, "windowStart"),
+            window_end=slot_of(m, "windowEnd")
         ))
 
     # New
-    for n in payload["events"].get("new", []):
-        wstart = parse_iso_localized(n["windowStart"], tz).astimezone(tz) if n.get("windowStart") else None
-        wend = parse_iso_localized(n["windowEnd"], tz).astimezone(tz) if n.get("windowEnd") else None
+    for n in new_json:
         flex.append(FlexibleEvent(
             id=n["id"],
             priority=n["priority"],
@@ -203,104 +251,119 @@ def build_debug_info(payload: Dict[str, Any],
             overlap=(not n.get("isInPerson", True)) or n.get("canOverlap", False),
             current_start_slot=None,
             window=n["window"],
-            window_start=horizon.dt_to_slot(wstart) if wstart else None,
-            window_end=horizon.dt_to_slot(wend) if wend else None
+            window_start=slot_of(n, "windowStart"),
+            window_end=slot_of(n, "windowEnd")
         ))
 
-    # starts que bloquean capacidad
-    fixed_blocking = [f for f in fixed if f.blocks_capacity]
+    # Filas por código de prioridad: (distancia, fuera de preferencia, cruce de día, mover)
+    weights_by_code = weight_table(weights, (e.priority_code for e in flex))
+
+    # Suma prefija de los slots bloqueados; solo se consulta para eventos que
+    # no pueden solaparse (buffer completo).
+    blocked_cumsum = prefix_sum(blocked)
+    # Días no activos + bloqueos en una sola suma prefija: ambos son conteos >= 0,
+    # así que una ventana está libre de los dos si la suma es 0.
+    hard_cumsum = disallowed_cumsum + blocked_cumsum
 
     # Helpers internos
 
-    def filter_to_preferred_if_possible(starts: List[int], dur: int, require: bool = False) -> List[int]:
-        def fits_set(s: int, slot_set: Set[int]) -> bool:
-            return all(t in slot_set for t in range(s, s + dur))
-
-        # Nivel 1: slots preferidos del usuario
-        if preferred_slots:
-            pref = [s for s in starts if fits_set(s, preferred_slots)]
-            if pref:
-                return pref
-
-        # Nivel 2: horario laboral (fallback intermedio)
-        if working_hours_slots:
-            work = [s for s in starts if fits_set(s, working_hours_slots)]
-            if work:
-                return work
-
-        # Nivel 3: cualquier slot
-        return starts
-
-    def filter_allowed_days(starts: List[int], dur: int) -> List[int]:
-        if len(allowed_days) >= 7:
-            return starts
-        out = []
-        for s in starts:
-            day_set = {horizon.slot_to_dt(t).weekday() for t in range(s, s + dur)}
-            if day_set.issubset(allowed_days):
-                out.append(s)
-        return out
+    has_pref = bool(preferred_mask.any())
+    has_work = bool(working_mask.any())
 
     # Construcción de candidatos + costos por evento
-    candidates: Dict[str, List[int]] = {}
-    costs: Dict[Tuple[str, int], Costs] = {}
-
-    for e in flex:
-        base_range = list(expand_window_slots(e, horizon, now_slot))
+    # Estructura de arreglos: por evento, slots y cada componente de costo en
+    # arreglos paralelos (ordenados por costo total).
+    candidates: Dict[str, np.ndarray] = {}
+    costs: Dict[str, Dict[str, np.ndarray]] = {}
+    # La ventana solo depende de (window, windowStart, windowEnd): now_slot es fijo aquí
+    window_cache: Dict[Tuple[str, Optional[int], Optional[int]], range] = {}
+    # Dominio y costos sin movimiento por firma de evento; solo el costo de
+    # mover depende del evento (currentStart), y se suma después.
+    domain_cache: Dict[Tuple[Any, ...], Tuple[np.ndarray, ...]] = {}
+
+    def event_domain(e: FlexibleEvent) -> Tuple[np.ndarray, ...]:
+        window_key = (e.window, e.window_start, e.window_end)
+        window = window_cache.get(window_key)
+        if window is None:
+            window = expand_window_slots(e, horizon, now_slot, semana_range, mes_range, pronto_len)
+            window_cache[window_key] = window
         buffer_for_event = buffer_slots if not e.overlap else 0
 
         # asegurar que quepa completo: último inicio posible = end - dur
         latest_start = horizon.total_slots - (e.duration_slots + buffer_for_event)
-        if latest_start < 0:
-            candidates[e.id] = []
-            continue
-        base_range = [s for s in base_range if 0 <= s <= latest_start]
-
-        # política de fines de semana
-        base_range = filter_allowed_days(base_range, e.duration_slots)
-
-        starts = base_range
-
-        # Primero remover conflictos (dominio factible real), luego aplicar preferencia.
-        if not e.overlap and fixed_blocking:
-            starts = remove_conflicting_starts(starts, e.duration_slots, fixed_blocking, buffer_for_event)
-
-        # Preferencia con fallback de 3 niveles: preferidos → horario laboral → cualquier slot.
-        starts = filter_to_preferred_if_possible(starts, e.duration_slots)
-
-        # Calcular costos para TODOS los candidatos antes de truncar (mirrors solver.py)
-        for s in starts:
-            dist_cost = max(0, s - now_slot) * int(dist_w[e.priority])
-            offpref_slots = count_offpref_slots(s, e.duration_slots, preferred_slots)
-            offpref_cost = offpref_slots * int(offpref_w[e.priority])
-            cross_cost = int(crossday_w[e.priority]) if crosses_day(s, e.duration_slots, horizon) else 0
-            move_cost = 0
-            if e.current_start_slot is not None:
-                move_cost = 0 if s == e.current_start_slot else int(move_w[e.priority])
-            total = dist_cost + offpref_cost + cross_cost + move_cost
-            costs[(e.id, s)] = Costs(
-                total=total,
-                dist=dist_cost,
-                offpref=offpref_cost,
-                crossday=cross_cost,
-                movecost=move_cost
-            )
+        starts = np.arange(max(window.start, 0), min(window.stop, latest_start + 1), dtype=np.int64)
+
+        # Mismo kernel que el solver (compilado con SOLVER_JIT=1). Primero el
+        # dominio factible real: días activos (todos los días que ocupa el evento)
+        # y, si no puede solaparse, conflictos con fijos; ambos van en una sola
+        # suma prefija. Luego preferencia con fallback de 3 niveles:
+        # preferidos → horario laboral → cualquier slot.
+        hard_cumsum_e = hard_cumsum if not e.overlap else disallowed_cumsum
+        starts, offpref_slots = filter_candidates(
+            starts, e.duration_slots, False,
+            blocked_cumsum, hard_cumsum_e, notpref_cumsum, notwork_cumsum,
+            has_pref, has_work,
+        )
+
+        # Calcular costos para TODOS los candidatos antes de truncar (mirrors solver.py),
+        # en un solo paso vectorizado; los slots fuera de preferencia ya vienen del filtro.
+        total, dist, offpref, crossday, _ = candidate_costs(
+            starts, e.duration_slots, None, now_slot, offpref_slots, slot_day,
+            *weights_by_code[e.priority_code],
+        )
+        return starts, total, dist, offpref, crossday, reduce_candidates(starts, total)
 
-        # Ordenar por costo y conservar los 300 mejores candidatos
-        starts.sort(key=lambda s: (costs[(e.id, s)].total, s))
-        starts = starts[:300]
-
-        candidates[e.id] = starts
+    for e in flex:
+        sig = (e.window, e.window_start, e.window_end, e.duration_slots, e.overlap, e.priority_code)
+        domain = domain_cache.get(sig)
+        if domain is None:
+            domain = event_domain(e)
+            domain_cache[sig] = domain
+        starts, total, dist, offpref, crossday, order = domain
+
+        if e.current_start_slot is None:
+            move = np.zeros_like(total)
+        else:
+            move = np.where(starts == e.current_start_slot, 0, weights_by_code[e.priority_code, 3])
+            total = total + move
+            order = reduce_candidates(starts, total)
+
+        # Ordenar por costo (desempate por slot) y conservar los 300 mejores candidatos
+        candidates[e.id] = starts[order]
+        costs[e.id] = {
+            "total": total[order],
+            "distance": dist[order],
+            "offPreference": offpref[order],
+            "crossDay": crossday[order],
+            "move": move[order],
+        }
 
     # Mapear la solución: qué slot se eligió por evento flexible
+    # (todas las marcas en un paso; si alguna no se puede leer, se cae al
+    # recorrido uno a uno, que deja en None solo las inválidas)
     chosen_slot_by_id: Dict[str, Optional[int]] = {}
-    for item in result.get("placed", []):
-        ev_id = item["id"]
-        try:
-            dt = parse_iso_localized(item["start"], tz)
-            chosen_slot_by_id[ev_id] = horizon.dt_to_slot(dt)
-        except Exception:
-            chosen_slot_by_id[ev_id] = None
+    placed = result.get("placed", [])
+    try:
+        placed_slots = horizon.isos_to_slots([item["start"] for item in placed])
+        for item in placed:
+            chosen_slot_by_id[item["id"]] = placed_slots[item["start"]][0]
+    except Exception:
+        for item in placed:
+            ev_id = item["id"]
+            try:
+                dt = parse_iso_localized(item["start"], tz)
+                chosen_slot_by_id[ev_id] = horizon.dt_to_slot(dt)
+            except Exception:
+                chosen_slot_by_id[ev_id] = None
+
+    # ISO por slot, bajo demanda: inicios y fines se repiten entre candidatos y eventos
+    iso_by_slot: Dict[int, str] = {}
+
+    def slot_iso(s: int) -> str:
+        iso = iso_by_slot.get(s)
+        if iso is None:
+            iso = iso_by_slot[s] = horizon.slot_to_dt(s).isoformat()
+        return iso
 
     # Armar estructura de depuración
     debug_events: Dict[str, Any] = {}
@@ -313,28 +376,16 @@ def build_debug_info(payload: Dict[str, Any],
             "windowStartSlot": e.window_start,
             "windowEndSlot": e.window_end,
             "currentStartSlot": e.current_start_slot,
-            "candidates": [],
+            "candidates": DebugCandidates(
+                slot_iso=slot_iso,
+                duration_slots=e.duration_slots,
+                slots=candidates[e.id],
+                costs=costs.get(e.id, {}),
+                chosen_slot=chosen_slot_by_id.get(e.id),
+            ),
             "chosenSlot": chosen_slot_by_id.get(e.id),
         }
 
-        for s in candidates.get(e.id, []):
-            c = costs[(e.id, s)]
-            start_dt = horizon.slot_to_dt(s)
-            end_dt = horizon.slot_to_dt(s + e.duration_slots)
-            ev_info["candidates"].append({
-                "slot": s,
-                "startISO": start_dt.isoformat(),
-                "endISO": end_dt.isoformat(),
-                "totalCost": c.total,
-                "breakdown": {
-                    "distance": c.dist,
-                    "offPreference": c.offpref,
-                    "crossDay": c.crossday,
-                    "move": c.movecost,
-                },
-                "selected": (s == ev_info["chosenSlot"]),
-            })
-
         debug_events[e.id] = ev_info
 
     return {
@@ -344,7 +395,7 @@ def build_debug_info(payload: Dict[str, Any],
             "slotMinutes": horizon.slot_minutes,
             "totalSlots": horizon.total_slots,
         },
-        "preferredSlotsCount": len(preferred_slots),
+        "preferredSlotsCount": int(preferred_mask.sum()),
         "fixedEvents": [
             {
                 "id": f.id,
@@ -395,13 +446,13 @@ def pretty_print_debug(debug: Dict[str, Any], result: Dict[str, Any]) -> None:
 
         # Interpretación tipo "variable y dominio"
         print("  Variable de decisión:")
-        print(f"    x_{ev_id}_s ∈ {{slots candidatos}}")
+        print(f"    s_{ev_id} ∈ {{slots candidatos}}")
 
         print("  Dominio (candidatos, vista resumida):")
         cands = info["candidates"]
         total_cands = len(cands)
 
-        if not cands:
+        if not total_cands:
             print("    (sin candidatos factibles; el solver no puede programar este evento)")
         else:
             # Elegimos algunos índices representativos:
@@ -419,18 +470,16 @@ def pretty_print_debug(debug: Dict[str, Any], result: Dict[str, Any]) -> None:
                 indices.add(i)
 
             # slot elegido (si hay)
-            chosen_slot = info["chosenSlot"]
-            if chosen_slot is not None:
-                for i, cand in enumerate(cands):
-                    if cand["slot"] == chosen_slot:
-                        indices.add(i)
-                        break
+            chosen_idx = cands.index_of(info["chosenSlot"])
+            if chosen_idx is not None:
+                indices.add(chosen_idx)
 
             # ordenamos índices finales
             shown_indices = sorted(indices)
 
+            # solo se formatean (ISO incluidos) los candidatos que se muestran
             for i in shown_indices[:MAX_CANDIDATES_SHOWN]:
-                cand = cands[i]
+                cand = cands.format(i)
                 flag = " <= ELEGIDO" if cand["selected"] else ""
                 bd = cand["breakdown"]
                 print(
@@ -471,6 +520,11 @@ def main():
         nargs="?",
         help="Ruta del archivo JSON de entrada (si se omite, se lee de stdin)",
     )
+    ap.add_argument(
+        "--full",
+        action="store_true",
+        help="Emite la info de depuración completa en JSON (todos los candidatos) en vez del resumen",
+    )
     args = ap.parse_args()
 
     if args.json:
@@ -485,6 +539,12 @@ def main():
     # Construir info de depuración
     debug = build_debug_info(payload, result)
 
+    if args.full:
+        for info in debug["flexibleEvents"].values():
+            info["candidates"] = info["candidates"].to_list()
+        print(json.dumps({"debug": debug, "result": result}, ensure_ascii=False, indent=2))
+        return
+
     # Imprimir explicación legible
     pretty_print_debug(debug, result)
 